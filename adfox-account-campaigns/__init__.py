@@ -4,77 +4,269 @@
 Скрипт для получения кампаний из AdFox API и парсинга их в Python объекты
 """
 
+import codecs
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import io
 import os
 import requests
+from requests.adapters import HTTPAdapter
 import xml.etree.ElementTree as ET
+from dataclasses import dataclass, fields
 from datetime import datetime
 import json
 import re
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Кодировщик для стандартного json, создается один раз на модуль.
+# Без indent используется C-ускоритель модуля json.
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
 # Константы
-LIMIT = 100  # Глобальная константа для лимита
+LIMIT = 100  # Глобальная константа для лимита (кампаний на страницу)
+MAX_WORKERS = 8  # Число параллельных запросов страниц
 BASE_URL = "https://adfox.yandex.ru/api/v1"
+RESPONSE_END_TAG = b'</response>'
+RESPONSE_CHUNK_SIZE = 64 * 1024  # Размер части при потоковом чтении ответа
+DEFAULT_CODEC = codecs.lookup('windows-1251')  # Обычная кодировка ответов AdFox
+REQUEST_TIMEOUT = (5, 30)  # Таймауты (подключение, чтение) в секундах
+ROW_TAG_RE = re.compile(r'row\d+')  # Теги строк кампаний: row0, row1, ...
+_MISSING = object()  # Маркер отсутствующего ключа при сборке словаря
+
+@dataclass(slots=True)
+class Campaign:
+    """Кампания AdFox
+    
+    Известные поля хранятся в слотах (числовые уже приведены к int),
+    остальные поля ответа API - в словаре extra (None, если их нет).
+    """
+    ID: str | None = None
+    name: str | None = None
+    maxImpressions: int = 0
+    maxClicks: int = 0
+    maxImpressionsPerDay: int = 0
+    maxClicksPerDay: int = 0
+    maxImpressionsPerHour: int = 0
+    maxClicksPerHour: int = 0
+    impressionsHour: int = 0
+    clicksHour: int = 0
+    impressionsToday: int = 0
+    clicksToday: int = 0
+    impressionsAll: int = 0
+    clicksAll: int = 0
+    priority: int = 0
+    status: int = 0
+    level: int = 0
+    cpm: int = 0
+    cpc: int = 0
+    kind_id: int = 0
+    sectorID: int = 0
+    rotationMethodID: int = 0
+    trafficPercents: int = 0
+    logicType: int = 0
+    CTR: str | None = None
+    dateStart: str | None = None
+    dateEnd: str | None = None
+    extra: dict | None = None
+    
+    @classmethod
+    def from_row(cls, row):
+        """Создать кампанию из словаря строки ответа"""
+        known = {}
+        extra = {}
+        for name, value in row.items():
+            if name in _CAMPAIGN_FIELD_SET:
+                known[name] = value
+            else:
+                extra[name] = value
+        # Пустой словарь не храним: большинство строк содержит только известные поля
+        return cls(**known, extra=extra or None)
+    
+    def as_dict(self):
+        """Плоский словарь полей кампании, как в ответе API"""
+        data = {name: getattr(self, name) for name in _CAMPAIGN_FIELDS}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+# Поля кампании из ответа API и числовые поля среди них
+# (тип сравнивается и со строкой - на случай from __future__ import annotations)
+_CAMPAIGN_FIELDS = tuple(f.name for f in fields(Campaign) if f.name != 'extra')
+_CAMPAIGN_FIELD_SET = frozenset(_CAMPAIGN_FIELDS)
+_INT_FIELDS = tuple(f.name for f in fields(Campaign) if f.type in (int, 'int'))
 
+@functools.lru_cache(maxsize=1)
 def get_start_of_month():
-    """Получить начало текущего месяца в формате YYYY-MM-DD"""
+    """Получить начало текущего месяца в формате YYYY-MM-DD
+    
+    Значение вычисляется один раз за запуск, чтобы все вызовы
+    использовали одну и ту же дату даже при смене месяца во время работы.
+    """
     now = datetime.now()
     return now.replace(day=1).strftime('%Y-%m-%d')
 
-def clean_xml_response(xml_content):
-    """Очистить XML ответ от проблемных символов"""
-    # Найдем последний валидный тег </response>
-    last_response_end = xml_content.rfind('</response>')
-    if last_response_end != -1:
-        # Обрежем до конца тега </response>
-        clean_content = xml_content[:last_response_end + len('</response>')]
-        return clean_content
-    return xml_content
-
-def xml_to_dict(element):
-    """Рекурсивно конвертирует XML элемент в словарь"""
-    result = {}
+@functools.lru_cache(maxsize=1)
+def get_session():
+    """Получить общую сессию для запросов к AdFox API
     
-    # Если элемент имеет дочерние элементы
-    if len(element) > 0:
-        for child in element:
-            child_data = xml_to_dict(child)
-            
-            # Если уже есть ключ с таким именем, создаем список
-            if child.tag in result:
-                if not isinstance(result[child.tag], list):
-                    result[child.tag] = [result[child.tag]]
-                result[child.tag].append(child_data)
-            else:
-                result[child.tag] = child_data
-    else:
-        # Если элемент содержит только текст
+    Сессия создается один раз: переиспользует TCP/TLS соединения между
+    запросами, а заголовок авторизации собирается только при создании.
+    """
+    # Получение токена из переменных окружения
+    auth_token = os.getenv('AUTH_TOKEN')
+    if not auth_token:
+        raise ValueError("AUTH_TOKEN не найден в переменных окружения")
+    
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+    session.headers.update({
+        'Authorization': f'OAuth {auth_token}',
+        # XML хорошо сжимается; requests распаковывает ответ автоматически
+        'Accept-Encoding': 'gzip, deflate'
+    })
+    return session
+
+def read_xml_response(response):
+    """Прочитать тело ответа до закрывающего тега </response>
+    
+    Ответ читается по частям, и чтение прекращается, как только найден
+    тег: мусор, который AdFox дописывает после XML, не скачивается.
+    Сам XML буферизуется целиком. Если тег так и не встретился,
+    возвращается все тело.
+    """
+    content = bytearray()
+    for chunk in response.iter_content(RESPONSE_CHUNK_SIZE):
+        # Тег мог разорваться на границе частей - ищем с небольшим перекрытием
+        search_from = max(len(content) - len(RESPONSE_END_TAG) + 1, 0)
+        content += chunk
+        response_end = content.find(RESPONSE_END_TAG, search_from)
+        if response_end != -1:
+            # Обрежем до конца тега </response>
+            del content[response_end + len(RESPONSE_END_TAG):]
+            break
+    return bytes(content)
+
+def element_to_value(element):
+    """Конвертирует XML элемент в текст или словарь дочерних элементов
+    
+    Повторяющиеся теги собираются в список, вложенные элементы - в словари.
+    """
+    # Если элемент содержит только текст
+    if len(element) == 0:
         return element.text
     
+    result = {}
+    for child in element:
+        value = element_to_value(child)
+        
+        # Если уже есть ключ с таким именем, создаем список
+        existing = result.get(child.tag, _MISSING)
+        if existing is _MISSING:
+            result[child.tag] = value
+        elif isinstance(existing, list):
+            existing.append(value)
+        else:
+            result[child.tag] = [existing, value]
+    
     return result
 
-def parse_campaigns_data(xml_data):
-    """Парсит данные кампаний из XML структуры"""
+def parse_campaigns(source):
+    """Потоково парсит кампании из XML ответа за один проход
+    
+    Строки result/data/row* сразу собираются в словари кампаний с
+    приведенными числовыми полями, промежуточное дерево не строится.
+    Возвращает список кампаний и общее число строк result/total_rows
+    (None, если его нет в ответе).
+    """
     campaigns = []
+    total_rows = None
+    # Путь тегов от корня до текущего открытого элемента
+    path = []
     
-    if 'result' in xml_data and 'data' in xml_data['result']:
-        data = xml_data['result']['data']
+    for event, element in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            path.append(element.tag)
+            continue
         
+        path.pop()
         # Извлекаем все строки (row0, row1, row2, ...)
-        for key, value in data.items():
-            if key.startswith('row') and isinstance(value, dict):
-                campaigns.append(value)
+        if (len(path) == 3 and path[1] == 'result' and path[2] == 'data'
+                and ROW_TAG_RE.fullmatch(element.tag)):
+            if len(element) > 0:
+                row = element_to_value(element)
+                campaigns.append(Campaign.from_row(parse_campaign_value(row)))
+            # Освобождаем уже разобранную строку
+            element.clear()
+        elif len(path) == 2 and path[1] == 'result' and element.tag == 'total_rows':
+            total_rows = int(element.text or 0)
+    
+    return campaigns, total_rows
+
+def _make_campaign_value_parser(field_names):
+    """Генерирует функцию приведения числовых полей кампании
     
-    return campaigns
+    Цикл по списку полей разворачивается в линейный код с константными
+    ключами, поэтому на каждую кампанию не тратится интерпретация цикла.
+    """
+    lines = [
+        'def parse_campaign_value(value):',
+        '    """Парсит саму кампанию"""',
+    ]
+    for field_name in field_names:
+        lines.append(f'    field_value = value.get({field_name!r})')
+        lines.append(f'    value[{field_name!r}] = int(field_value) if field_value else 0')
+    lines.append('    return value')
+    
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['parse_campaign_value']
+
+parse_campaign_value = _make_campaign_value_parser(_INT_FIELDS)
+
+def fetch_campaigns_page(params, offset):
+    """Получить одну страницу кампаний из AdFox API
+    
+    Возвращает список кампаний страницы и общее число кампаний.
+    Ошибки запроса и парсинга пробрасываются вызывающему.
+    """
+    params = {**params, 'offset': offset}
+    
+    # Выполнение запроса, тело ответа читается потоково
+    with get_session().get(BASE_URL, params=params,
+                           timeout=REQUEST_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        
+        # Определяем кодировку из заголовка Content-Type или используем windows-1251 по умолчанию
+        codec = DEFAULT_CODEC
+        content_type = response.headers.get('Content-Type', '')
+        if 'charset=' in content_type:
+            codec = codecs.lookup(content_type.split('charset=')[1].split(';')[0].strip())
+        
+        # Читаем XML без проблемных символов после него
+        raw_xml = read_xml_response(response)
+    
+    # Декодируем содержимое с правильной кодировкой
+    clean_xml, _ = codec.decode(raw_xml)
+    
+    # Потоковый парсинг кампаний из XML ответа
+    return parse_campaigns(io.StringIO(clean_xml))
 
 def get_campaigns():
-    """Получить список кампаний из AdFox API"""
+    """Получить список кампаний из AdFox API (None при ошибке)
     
-    # Получение токена из переменных окружения
-    auth_token = os.getenv('AUTH_TOKEN')
-    if not auth_token:
-        raise ValueError("AUTH_TOKEN не найден в переменных окружения")
+    API отдает не больше LIMIT кампаний за запрос, поэтому после первой
+    страницы остальные запрашиваются параллельно по смещению.
+    """
+    
+    # Создаем сессию заранее: проверка токена и общий пул для всех потоков
+    get_session()
     
-    # Параметры запроса
+    # Параметры запроса (смещение добавляется для каждой страницы)
     params = {
         'object': 'account',
         'action': 'list',
@@ -83,41 +275,30 @@ def get_campaigns():
         'show': 'advanced',
         'limit': LIMIT
     }
-    
-    # Заголовки
-    headers = {
-        'Authorization': f'OAuth {auth_token}'
-    }
+    fetch_page = functools.partial(fetch_campaigns_page, params)
     
     try:
         print(f"Выполняется запрос к {BASE_URL}")
         print(f"Параметры: {params}")
         
-        # Выполнение запроса
-        response = requests.get(BASE_URL, params=params, headers=headers)
-        response.raise_for_status()
-        
-        print(f"Ответ получен, статус: {response.status_code}")
-        
-        # Определяем кодировку из заголовка Content-Type или используем windows-1251 по умолчанию
-        encoding = 'windows-1251'
-        content_type = response.headers.get('Content-Type', '')
-        if 'charset=' in content_type:
-            encoding = content_type.split('charset=')[1].split(';')[0].strip()
-        
-        # Декодируем содержимое с правильной кодировкой
-        xml_content = response.content.decode(encoding)
-        
-        # Очищаем XML от проблемных символов
-        clean_xml = clean_xml_response(xml_content)
+        campaigns, total_rows = fetch_page(0)
+        print(f"Получена страница со смещением 0: {len(campaigns)} кампаний")
         
-        # Парсинг XML ответа
-        root = ET.fromstring(clean_xml)
+        # Остальные страницы (если есть) загружаем параллельно,
+        # печатаем только из основного потока, чтобы вывод не перемешивался
+        offsets = range(LIMIT, total_rows or 0, LIMIT)
+        if offsets:
+            executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+            try:
+                pages = executor.map(fetch_page, offsets)
+                for offset, (page, _) in zip(offsets, pages):
+                    print(f"Получена страница со смещением {offset}: {len(page)} кампаний")
+                    campaigns.extend(page)
+            finally:
+                # При ошибке не запрашиваем оставшиеся в очереди страницы
+                executor.shutdown(cancel_futures=True)
         
-        # Конвертация XML в Python объекты
-        result = xml_to_dict(root)
-        
-        return result
+        return campaigns
         
     except requests.RequestException as e:
         print(f"Ошибка при выполнении запроса: {e}")
@@ -129,6 +310,27 @@ def get_campaigns():
         print(f"Ошибка декодирования: {e}")
         return None
 
+def _json_dumps(obj):
+    """Сериализовать объект в JSON байты (через orjson, если он установлен)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _JSON_ENCODER.encode(obj).encode('utf-8')
+
+def save_campaigns_json(metadata, campaigns, output_file):
+    """Сохранить метаданные и кампании в JSON файл
+    
+    Кампании сериализуются и пишутся по одной (каждая на своей строке),
+    поэтому весь документ целиком в памяти не собирается.
+    """
+    with open(output_file, 'wb') as f:
+        f.write(b'{"metadata": ')
+        f.write(_json_dumps(metadata))
+        f.write(b',\n"campaigns": [')
+        for i, campaign in enumerate(campaigns):
+            f.write(b',\n' if i else b'\n')
+            f.write(_json_dumps(campaign.as_dict()))
+        f.write(b'\n]}\n')
+
 def print_campaign_stats(campaigns):
     """Вывести статистику по кампаниям"""
     if not campaigns:
@@ -139,24 +341,24 @@ def print_campaign_stats(campaigns):
     print(f"Всего кампаний: {len(campaigns)}")
     
     # Подсчет по статусам
-    status_counts = {}
-    for campaign in campaigns:
-        status = campaign.get('status', 'unknown')
-        status_counts[status] = status_counts.get(status, 0) + 1
+    status_counts = Counter(c.status for c in campaigns)
     
     status_names = {
-        '0': 'Активные',
-        '1': 'Приостановленные', 
-        '2': 'Завершенные'
+        0: 'Активные',
+        1: 'Приостановленные',
+        2: 'Завершенные'
     }
     
     for status, count in status_counts.items():
         status_name = status_names.get(status, f'Статус {status}')
         print(f"{status_name}: {count}")
     
-    # Общая статистика
-    total_impressions = sum(int(c.get('impressionsAll', 0) or 0) for c in campaigns)
-    total_clicks = sum(int(c.get('clicksAll', 0) or 0) for c in campaigns)
+    # Общая статистика за один проход по кампаниям
+    total_impressions = 0
+    total_clicks = 0
+    for campaign in campaigns:
+        total_impressions += campaign.impressionsAll
+        total_clicks += campaign.clicksAll
     
     print(f"\nОбщие показатели:")
     print(f"Всего показов: {total_impressions:,}")
@@ -176,13 +378,10 @@ def main():
     print(f"Лимит: {LIMIT}")
     
     try:
-        # Получение данных
-        data = get_campaigns()
+        # Получение и парсинг кампаний
+        campaigns = get_campaigns()
         
-        if data:
-            # Парсинг кампаний
-            campaigns = parse_campaigns_data(data)
-            
+        if campaigns is not None:
             if campaigns:
                 print_campaign_stats(campaigns)
                 
@@ -190,28 +389,24 @@ def main():
                 print(f"\nПервые 3 кампании:")
                 for i, campaign in enumerate(campaigns[:3]):
                     print(f"\n--- Кампания {i+1} ---")
-                    print(f"ID: {campaign.get('ID', 'N/A')}")
-                    print(f"Название: {campaign.get('name', 'N/A')}")
-                    print(f"Статус: {campaign.get('status', 'N/A')}")
-                    print(f"Лимит показов в день: {campaign.get('maxImpressionsPerDay', 'N/A')}")
-                    print(f"Показы всего: {campaign.get('impressionsAll', 'N/A')}")
-                    print(f"Клики всего: {campaign.get('clicksAll', 'N/A')}")
-                    print(f"CTR: {campaign.get('CTR', 'N/A')}")
-                    print(f"Дата начала: {campaign.get('dateStart', 'N/A')}")
-                    print(f"Дата окончания: {campaign.get('dateEnd', 'N/A')}")
+                    print(f"ID: {campaign.ID or 'N/A'}")
+                    print(f"Название: {campaign.name or 'N/A'}")
+                    print(f"Статус: {campaign.status}")
+                    print(f"Лимит показов в день: {campaign.maxImpressionsPerDay}")
+                    print(f"Показы всего: {campaign.impressionsAll}")
+                    print(f"Клики всего: {campaign.clicksAll}")
+                    print(f"CTR: {campaign.CTR or 'N/A'}")
+                    print(f"Дата начала: {campaign.dateStart or 'N/A'}")
+                    print(f"Дата окончания: {campaign.dateEnd or 'N/A'}")
                 
                 # Сохранение в JSON файл
                 output_file = 'adfox_campaigns.json'
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump({
-                        'metadata': {
-                            'total_campaigns': len(campaigns),
-                            'fetch_date': datetime.now().isoformat(),
-                            'date_from': get_start_of_month(),
-                            'limit': LIMIT
-                        },
-                        'campaigns': campaigns
-                    }, f, ensure_ascii=False, indent=2)
+                save_campaigns_json({
+                    'total_campaigns': len(campaigns),
+                    'fetch_date': datetime.now().isoformat(),
+                    'date_from': get_start_of_month(),
+                    'limit': LIMIT
+                }, campaigns, output_file)
                 
                 print(f"\nДанные сохранены в {output_file}")
             else: